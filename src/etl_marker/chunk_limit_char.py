@@ -2,9 +2,10 @@ import json
 import re
 from pathlib import Path
 from copy import deepcopy
-from typing import List, Dict, Any
+from typing import Iterator, List, Dict, Any, Tuple
 from fastapi import FastAPI
 from src.path import OUTPUT_DIR
+from src.etl_marker.schema_to_chunks import safe_filename
 
 # =========================================================
 # CONFIG
@@ -189,12 +190,31 @@ def split_chunk_recursive(chunk: Dict[str, Any], depth: int = 0) -> List[Dict[st
 # FILE PROCESSING
 # =========================================================
 
-def process_chunk_file(chunk_file: Path, output_dir: Path) -> int:
-    chunk = json.loads(chunk_file.read_text(encoding="utf-8"))
+def iter_document_chunks(doc_dir: Path) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield (file name, chunk) for every clause chunk of one document.
+    Reads the <doc_id>.jsonl shard written by schema_to_chunks when
+    present, otherwise the legacy one-JSON-file-per-chunk layout.
+    """
+    shard = doc_dir / f"{doc_dir.name}.jsonl"
+
+    if shard.is_file():
+        with shard.open(encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                yield f"{safe_filename(chunk.get('clause_id', 'unknown'))}.json", chunk
+        return
+
+    for chunk_file in sorted(doc_dir.glob("*.json")):
+        yield chunk_file.name, json.loads(chunk_file.read_text(encoding="utf-8"))
+
+def process_chunk(chunk: Dict[str, Any], file_name: str, output_dir: Path) -> int:
     total_len = get_all_text_length(chunk)
 
     if total_len <= MAX_CHARS:
-        out_path = output_dir / chunk_file.name
+        out_path = output_dir / file_name
         out_path.write_text(
             json.dumps(chunk, indent=2, ensure_ascii=False),
             encoding="utf-8"
@@ -240,9 +260,9 @@ def split_all_chunks():
         out_dir = SHORT_CHUNK_DIR / doc_dir.name
         out_dir.mkdir(parents=True, exist_ok=True)
 
-        for file in sorted(doc_dir.glob("*.json")):
+        for file_name, chunk in iter_document_chunks(doc_dir):
             original_count += 1
-            output_count += process_chunk_file(file, out_dir)
+            output_count += process_chunk(chunk, file_name, out_dir)
 
     return {
         "status": "success",
@@ -1,4 +1,6 @@
+import os
 import shutil
+from pathlib import Path
 from fastapi import FastAPI
 
 from src.path import MARKER_JSON_DIR, OUTPUT_JSON_DIR
@@ -9,6 +11,19 @@ app = FastAPI(title="Collect Marker JSON API")
 # Original logic
 # -------------------------
 
+def link_or_copy(src: Path, dest: Path):
+    """
+    Hardlink src into place so no bytes are copied.
+    Falls back to copy2 (sendfile on Linux) when linking is not
+    possible, e.g. across filesystems.
+    """
+    if dest.exists():
+        dest.unlink()
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
 def collect_marker_jsons():
     collected = []
 
@@ -21,7 +36,7 @@ def collect_marker_jsons():
         json_file = doc_dir / f"{doc_dir.name}.json"
         if json_file.exists():
             dest = OUTPUT_JSON_DIR / json_file.name
-            shutil.copy2(json_file, dest)
+            link_or_copy(json_file, dest)
             collected.append(json_file.name)
 
     return collected
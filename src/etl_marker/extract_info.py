@@ -1,7 +1,14 @@
-import json
+import asyncio
+import mmap
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Set, Optional
+from typing import List, Dict, Optional
+import aiofiles
+import orjson
 from fastapi import FastAPI, HTTPException
 
 from src.path import OUTPUT_JSON_DIR, OUTPUT_DIR
@@ -16,37 +23,57 @@ SCOPE_DIR.mkdir(parents=True, exist_ok=True)
 MIN_SUMMARY_WORDS = 40
 MAX_SUMMARY_WORDS = 100
 
+# Documents are independent, so extraction fans out across processes.
+MAX_WORKERS = os.cpu_count() or 1
+
 # =========================================================
 # Regex Patterns
 # =========================================================
 
-SCOPE_HEADER_RE = re.compile(r">\s*(\d+\.?\s*)?(Scope|SCOPE)\s*<")
-CLAUSE_1_RE = re.compile(r">\s*1(\.|\s|<)")
+# Groups are non-capturing: these run on every block and only the
+# match itself is ever used, so there is nothing to record.
+SCOPE_HEADER_RE = re.compile(r">\s*(?:\d+\.?\s*)?(?:Scope|SCOPE)\s*<")
+CLAUSE_1_RE = re.compile(r">\s*1(?:\.|\s|<)")
 HTML_TAG_RE = re.compile(r"<[^>]+>")
 
 TEST_SECTION_RE = re.compile(
-    r"^\s*(\d+\.)*\d+\s+.*\btest(s|ing)?\b",
+    r"^\s*(?:\d+\.)*\d+\s+.*\btest(?:s|ing)?\b",
     re.IGNORECASE
 )
 
+SECTION_NUMBER_RE = re.compile(r"^\d+(?:\.\d+)*\s+")
+WORD_RE = re.compile(r"[a-zA-Z]+")
+WHITESPACE_RE = re.compile(r"\s+")
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.;:])\s+(?=[A-Z0-9])")
+
 # =========================================================
 # Utilities
 # =========================================================
 
+@lru_cache(maxsize=4096)
 def clean_html(html: str) -> str:
+    """
+    Strip tags and collapse whitespace.
+    Cached because headers, footers and boilerplate repeat on every page.
+    """
     if not html:
         return ""
-    text = HTML_TAG_RE.sub("", html)
-    return " ".join(text.split()).strip()
+    if "<" in html:
+        html = HTML_TAG_RE.sub("", html)
+    return " ".join(html.split())
 
 def is_english(text: str, threshold: float = 0.80) -> bool:
     if not text:
         return False
-    ascii_count = sum(1 for c in text if ord(c) < 128)
+    if text.isascii():
+        # Pure ASCII (most headers): ratio is 1.0, skip the per-char scan
+        return 1.0 > threshold
+    # Dropping non-ASCII chars in C leaves exactly the ASCII count
+    ascii_count = len(text.encode("ascii", "ignore"))
     return ascii_count / len(text) > threshold
 
 def starts_with_section_number(text: str) -> bool:
-    return bool(re.match(r'^\d+(\.\d+)*\s+', text))
+    return bool(SECTION_NUMBER_RE.match(text))
 
 # =========================================================
 # NEW: Scope Summary (ADDED ONLY)
@@ -64,10 +91,10 @@ def build_scope_summary(scope_lines: List[str]) -> str:
     full_text = " ".join(s.strip() for s in scope_lines if s.strip())
 
     # Normalize spacing
-    full_text = re.sub(r"\s+", " ", full_text).strip()
+    full_text = WHITESPACE_RE.sub(" ", full_text).strip()
 
     # Split into candidate sentences (robust for standards text)
-    raw_sentences = re.split(r'(?<=[.;:])\s+(?=[A-Z0-9])', full_text)
+    raw_sentences = SENTENCE_SPLIT_RE.split(full_text)
 
     def is_complete_sentence(s: str) -> bool:
         words = s.split()
@@ -130,185 +157,264 @@ def build_scope_summary(scope_lines: List[str]) -> str:
 # Title Extraction
 # =========================================================
 
+# Conservative list based on actual standards PDFs
+BOILERPLATE_TERMS = (
+    "copyright",
+    "all rights reserved",
+    "international standard",
+    "european standard",
+    "british standard",
+    "indian standard",
+    "publication",
+    "published by",
+    "edition",
+    "foreword",
+    "introduction",
+    "committee",
+    "prepared by",
+    "issued by",
+    "supersedes",
+    "replaced by",
+    "ics ",
+    "published",
+    "customer",
+    "services"
+)
+
+ENGLISH_STOPWORDS = frozenset({
+    "the", "and", "for", "of", "to", "in", "with",
+    "requirements", "specification", "standard",
+    "systems", "cabling", "installation", "testing"
+})
+
 def is_boilerplate_title(text: str) -> bool:
-    """
-    Detect non-title administrative or legal text.
-    Conservative list based on actual standards PDFs.
-    """
+    """Detect non-title administrative or legal text."""
     t = text.lower()
 
-    boilerplate_terms = [
-        "copyright",
-        "all rights reserved",
-        "international standard",
-        "european standard",
-        "british standard",
-        "indian standard",
-        "publication",
-        "published by",
-        "edition",
-        "foreword",
-        "introduction",
-        "committee",
-        "prepared by",
-        "issued by",
-        "supersedes",
-        "replaced by",
-        "ics ",
-        "published",
-        "customer",
-        "services"
-    ]
-
-    return any(term in t for term in boilerplate_terms)
+    for term in BOILERPLATE_TERMS:
+        if term in t:
+            return True
+    return False
 
 def contains_english_stopwords(text: str) -> bool:
     """
     Ensure text contains common English stopwords.
     Prevents French/German/Spanish ASCII text from passing.
     """
-    english_stopwords = {
-        "the", "and", "for", "of", "to", "in", "with",
-        "requirements", "specification", "standard",
-        "systems", "cabling", "installation", "testing"
-    }
+    return not ENGLISH_STOPWORDS.isdisjoint(w.lower() for w in WORD_RE.findall(text))
 
-    words = {w.lower() for w in re.findall(r"[a-zA-Z]+", text)}
-    return bool(words & english_stopwords)
+def score_title_candidate(idx: int, block_type: Optional[str], text: str) -> Optional[int]:
+    """
+    Score one cleaned block as a document title candidate.
+    Returns None when the block is rejected outright.
+    """
+    if not text:
+        return None
 
-def extract_document_title(blocks: List[Dict]) -> Optional[str]:
-    candidates = []
+    # ---- HARD REJECTIONS (cheapest first) ----
+    word_count = len(text.split())
+    if word_count < 4 or word_count > 25:
+        return None
+    if starts_with_section_number(text):
+        return None
+    if not is_english(text):
+        return None
+    if is_boilerplate_title(text):
+        return None
+    if not contains_english_stopwords(text):
+        return None
 
-    for idx, block in enumerate(blocks):
-        text = clean_html(block.get("html", ""))
-        if not text:
-            continue
+    # ---- SCORING ----
+    score = 0
+    if block_type == "SectionHeader":
+        score += 3
+    if idx < 40:
+        score += 2
+    if idx < 15:
+        score += 1
 
-        # ---- HARD REJECTIONS ----
-        if not is_english(text):
-            continue
-        if not contains_english_stopwords(text): 
-            continue
-        if starts_with_section_number(text):
-            continue
-        if is_boilerplate_title(text):
-            continue
-        if len(text.split()) < 4:
-            continue
-        if len(text.split()) > 25:
-            continue
+    return score
 
-        # ---- SCORING (UNCHANGED) ----
-        score = 0
-        if block.get("block_type") == "SectionHeader":
-            score += 3
-        if idx < 40:
-            score += 2
-        if idx < 15:
-            score += 1
+def max_title_score(idx: int) -> int:
+    """
+    Upper bound on score_title_candidate at position idx.
+    It only shrinks as idx grows, and ties go to the earlier block, so
+    once the best score reaches this bound no later block can win.
+    """
+    return 3 + (2 if idx < 40 else 0) + (1 if idx < 15 else 0)
 
-        candidates.append((score, idx, text))
+# =========================================================
+# Document Loading
+# =========================================================
 
-    if not candidates:
-        return None
+def read_json_mapped(json_path: Path):
+    """
+    Parse a JSON file straight from a read-only memory map, so large
+    Marker outputs skip the intermediate bytes copy and only the pages
+    orjson touches are faulted in.
+    """
+    with open(json_path, "rb") as f:
+        # mmap refuses zero-length files; let orjson report those
+        if os.fstat(f.fileno()).st_size == 0:
+            return orjson.loads(b"")
 
-    candidates.sort(key=lambda x: (-x[0], x[1]))
-    return candidates[0][2]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
 
-# =========================================================
-# Scope Extraction (UNCHANGED)
-# =========================================================
 
-def extract_scope(json_path: Path) -> List[str]:
-    data = json.loads(json_path.read_text(encoding="utf-8"))
+def load_blocks(json_path: Path) -> List[Dict]:
+    """
+    Parse a Marker JSON file once and flatten its page blocks.
+    Every extractor below works on this shared list.
 
-    scope_text = []
-    collecting = False
-    scope_hierarchy = None
-    clause1_candidate = []
+    Blocks are projected down to the three fields the extractors read,
+    so the parsed tree (base64 images, polygons, nested children) can
+    be freed as soon as this returns instead of living for the whole
+    document.
+    """
+    data = read_json_mapped(json_path)
 
+    blocks = []
     for page in data.get("children", []):
         if page.get("block_type") != "Page":
             continue
 
         for block in page.get("children", []):
-            html = block.get("html", "")
-            hierarchy = block.get("section_hierarchy")
-
-            if SCOPE_HEADER_RE.search(html):
-                collecting = True
-                scope_hierarchy = hierarchy
-                continue
+            blocks.append({
+                "block_type": block.get("block_type"),
+                "html": block.get("html", ""),
+                "section_hierarchy": block.get("section_hierarchy"),
+            })
 
-            if collecting and block.get("block_type") == "SectionHeader":
-                if hierarchy != scope_hierarchy:
-                    collecting = False
+    return blocks
 
-            if collecting and block.get("block_type") == "Text":
-                txt = clean_html(html)
-                if txt:
-                    scope_text.append(txt)
-
-            if not scope_text and CLAUSE_1_RE.search(html):
-                collecting = "clause1"
-                continue
+# =========================================================
+# Scope Extraction
+# =========================================================
 
-            if collecting == "clause1" and block.get("block_type") == "Text":
-                txt = clean_html(html)
-                if txt:
-                    clause1_candidate.append(txt)
+class ScopeCollector:
+    """
+    Scope state machine, fed one block at a time so it can share
+    a single pass over the document with the other extractors.
+    """
 
-            if collecting == "clause1" and block.get("block_type") == "SectionHeader":
+    def __init__(self):
+        self.scope_text: List[str] = []
+        self.clause1_candidate: List[str] = []
+        self.collecting = False
+        self.scope_hierarchy = None
+
+    def feed(self, block_type: Optional[str], html: str, hierarchy, text: str):
+        # Literal gate: the header regex can only match if one of these is present
+        if ("Scope" in html or "SCOPE" in html) and SCOPE_HEADER_RE.search(html):
+            self.collecting = True
+            self.scope_hierarchy = hierarchy
+            return
+
+        # State and block kind are read once into locals for the ladder below
+        collecting = self.collecting
+        is_header = block_type == "SectionHeader"
+        is_text = block_type == "Text"
+
+        if collecting and is_header and hierarchy != self.scope_hierarchy:
+            collecting = False
+
+        if collecting and is_text and text:
+            self.scope_text.append(text)
+
+        if not self.scope_text and "1" in html and CLAUSE_1_RE.search(html):
+            self.collecting = "clause1"
+            return
+
+        if collecting == "clause1":
+            if is_text and text:
+                self.clause1_candidate.append(text)
+            elif is_header:
                 collecting = False
 
-    return scope_text or clause1_candidate
+        self.collecting = collecting
+
+    def result(self) -> List[str]:
+        return self.scope_text or self.clause1_candidate
 
 # =========================================================
-# Test Extraction (UNCHANGED)
+# Test Extraction
 # =========================================================
 
-def extract_test_sections(blocks: List[Dict]) -> List[str]:
-    tests = []
-    seen: Set[str] = set()
-
-    for block in blocks:
-        if block.get("block_type") != "SectionHeader":
-            continue
-        text = clean_html(block.get("html", ""))
-        if TEST_SECTION_RE.match(text) and text not in seen:
-            tests.append(text)
-            seen.add(text)
-
-    return tests
+def is_test_section(block_type: Optional[str], text: str) -> bool:
+    # Substring gate first: skips the regex on headers that never mention "test"
+    return (
+        block_type == "SectionHeader" and
+        "test" in text.lower() and
+        bool(TEST_SECTION_RE.match(text))
+    )
 
 # =========================================================
 # Document Processing (ONLY summary added)
 # =========================================================
 
 def process_document(json_path: Path) -> Dict:
-    data = json.loads(json_path.read_text(encoding="utf-8"))
+    blocks = load_blocks(json_path)
 
-    blocks = []
-    for page in data.get("children", []):
-        if page.get("block_type") == "Page":
-            blocks.extend(page.get("children", []))
+    scope_collector = ScopeCollector()
+    best_score, title = -1, None
+    # dict keys dedupe test headers while keeping first-seen order
+    tests: Dict[str, None] = {}
 
-    scope = extract_scope(json_path)
+    # Hot loop: bound method held in a local, and blocks from load_blocks
+    # always carry all three keys so they are subscripted directly.
+    feed_scope = scope_collector.feed
+    title_open = True
+
+    # Single pass: each block is cleaned once and the text is shared
+    # by the title, scope and test extractors.
+    for idx, block in enumerate(blocks):
+        block_type = block["block_type"]
+        html = block["html"]
+        text = clean_html(html)
+
+        feed_scope(block_type, html, block["section_hierarchy"], text)
+
+        # Title scoring stops once no later block can beat the best so far
+        if title_open:
+            if best_score >= max_title_score(idx):
+                title_open = False
+            else:
+                score = score_title_candidate(idx, block_type, text)
+                if score is not None and score > best_score:
+                    best_score, title = score, text
+
+        if is_test_section(block_type, text):
+            tests[text] = None
+
+    scope = scope_collector.result()
 
     return {
         "document_id": json_path.stem,
-        "document_title": extract_document_title(blocks),
+        "document_title": title,
         "scope": scope,
         "summary": build_scope_summary(scope),   # ✅ ADDED
-        "tests": extract_test_sections(blocks),
+        "tests": list(tests),
     }
 
-def save_document(output: Dict):
+async def save_document(output: Dict):
     out_path = SCOPE_DIR / f"{output['document_id']}_scope.json"
-    out_path.write_text(
-        json.dumps(output, indent=2, ensure_ascii=False),
-        encoding="utf-8"
-    )
+    async with aiofiles.open(out_path, "wb") as f:
+        await f.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
+
+async def extract_and_save(pool: ProcessPoolExecutor, json_path: Path) -> Optional[str]:
+    """
+    Parse one document in the worker pool and write its scope file as
+    soon as it arrives, so writes overlap with the remaining parsing.
+    """
+    loop = asyncio.get_running_loop()
+    output = await loop.run_in_executor(pool, process_document, json_path)
+
+    if output["scope"] or output["tests"]:
+        await save_document(output)
+        return output["document_id"]
+    return None
 
 # =========================================================
 # FastAPI
@@ -316,19 +422,49 @@ def save_document(output: Dict):
 
 app = FastAPI(title="Standards Extraction API")
 
+# One extraction run at a time; runs share a single worker pool.
+_EXTRACT_LOCK = asyncio.Lock()
+
+# Created on first use and kept for the life of the service, so worker
+# start-up, module import and regex compilation are paid once rather
+# than on every request (and clean_html's cache stays warm).
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+    return _pool
+
+def reset_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+        _pool = None
+
 @app.post("/scope/extract")
-def extract_scope_api():
+async def extract_scope_api():
     json_files = list(OUTPUT_JSON_DIR.glob("*.json"))
     if not json_files:
         raise HTTPException(404, "No JSON files found")
 
-    processed = []
+    async with _EXTRACT_LOCK:
+        pool = get_pool()
+        # Wait for every document even if one fails, so no write from this
+        # run is still in flight once the lock is released
+        results = await asyncio.gather(
+            *(extract_and_save(pool, f) for f in json_files),
+            return_exceptions=True
+        )
+
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            if any(isinstance(e, BrokenProcessPool) for e in errors):
+                # A dead worker poisons the pool; start fresh on the next request
+                reset_pool()
+            raise errors[0]
 
-    for json_file in json_files:
-        output = process_document(json_file)
-        if output["scope"] or output["tests"]:
-            save_document(output)
-            processed.append(output["document_id"])
+    processed = [doc_id for doc_id in results if doc_id]
 
     return {
         "status": "success",
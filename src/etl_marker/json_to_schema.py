@@ -1,10 +1,12 @@
-import json
+import os
 import re
 import base64
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
-from collections import OrderedDict
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Any
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass, field
+import orjson
 from fastapi import FastAPI, HTTPException
 from src.path import OUTPUT_JSON_DIR, OUTPUT_SCHEMA_DIR, OUTPUT_DIR
 
@@ -12,36 +14,70 @@ from src.path import OUTPUT_JSON_DIR, OUTPUT_SCHEMA_DIR, OUTPUT_DIR
 # REGEX PATTERNS - For extracting structured information
 # =========================================================
 
-CLAUSE_WITH_TITLE_RE = re.compile(r'^([A-Z]|\d+)(?:\.(\d+))*\s+(.+)$', re.IGNORECASE)
-CLAUSE_NUM_ONLY_RE = re.compile(r'^([A-Z]|\d+)(?:\.(\d+))*\s*$', re.IGNORECASE)
+CLAUSE_WITH_TITLE_RE = re.compile(r'^(?:[A-Z]|\d+)(?:\.\d+)*\s+.+$', re.IGNORECASE)
+CLAUSE_NUM_ONLY_RE = re.compile(r'^(?:[A-Z]|\d+)(?:\.\d+)*\s*$', re.IGNORECASE)
 HTML_TAG_RE = re.compile(r'<[^>]+>')
 REQ_RE = re.compile(r'\b(shall not|shall|should|may)\b', re.IGNORECASE)
 TABLE_REF_RE = re.compile(r'\btable\s+([A-Z]?\d+(?:\.\d+)*)', re.IGNORECASE)
 FIGURE_REF_RE = re.compile(r'\b(?:figure|fig\.?)\s+([A-Z]?\d+(?:\.\d+)*)', re.IGNORECASE)
+REF_RE = re.compile(
+    r'\b(?:(?P<clause>clause|section|paragraph)|(?P<table>table)|(?P<figure>figure|fig\.?))'
+    r'\s+(?P<ref>[A-Z]?\d+(?:\.\d+)*)',
+    re.IGNORECASE
+)
+
+REQ_TYPE_MAP = {
+    "shall not": "prohibition",
+    "shall": "mandatory",
+    "should": "recommendation",
+    "may": "permission"
+}
+REQ_KEYWORDS = ("shall", "should", "may")
+
+# Worker processes for converting files in parallel
+MAX_WORKERS = os.cpu_count() or 1
+
+# Schemas are machine-read downstream; set True for indented, diffable output
+PRETTY_JSON = False
+JSON_WRITE_OPTIONS = orjson.OPT_INDENT_2 if PRETTY_JSON else 0
+
+# Threads used to write decoded images while parsing continues
+IMAGE_WRITE_WORKERS = 4
+
+# Queued image writes per document before parsing waits on the oldest,
+# so a large document never holds every decoded image in memory
+MAX_PENDING_WRITES = IMAGE_WRITE_WORKERS * 4
+
+# Image magic numbers keyed by their first two bytes: (full signature, extension)
+IMAGE_SIGNATURES = {
+    b"\x89P": (b"\x89PNG", ".png"),
+    b"\xff\xd8": (b"\xff\xd8\xff", ".jpg"),
+    b"GI": (b"GIF8", ".gif"),
+    b"BM": (b"BM", ".bmp"),
+}
 
 # =========================================================
 # DATA CLASSES
 # =========================================================
 
-@dataclass
+@dataclass(slots=True)
 class Requirement:
     type: str
     keyword: str
     text: str
 
-@dataclass
+@dataclass(slots=True)
 class ContentItem:
     type: str
     text: str
 
-@dataclass
+@dataclass(slots=True)
 class TableEntry:
     html: str
     number: Optional[str] = None
     caption: Optional[str] = None
-    rows: Optional[List[Any]] = None
 
-@dataclass
+@dataclass(slots=True)
 class FigureEntry:
     number: Any
     path: str
@@ -50,7 +86,7 @@ class FigureEntry:
     size_bytes: int
     caption: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Clause:
     id: str
     title: str
@@ -97,6 +133,9 @@ def strip_html(html: str) -> str:
     """Remove HTML tags and clean whitespace from text."""
     if not html:
         return ""
+    # No tag can start without '<'; skip the regex for plain text
+    if '<' not in html:
+        return html.strip()
     return HTML_TAG_RE.sub('', html).strip()
 
 def detect_image_format(data: bytes) -> str:
@@ -104,16 +143,11 @@ def detect_image_format(data: bytes) -> str:
     if not data:
         return ".bin"
     
-    format_signatures = [
-        (b"\x89PNG", ".png"),
-        (b"\xff\xd8\xff", ".jpg"),
-        (b"GIF8", ".gif"),
-        (b"BM", ".bmp"),
-    ]
-    
-    for signature, ext in format_signatures:
-        if data.startswith(signature):
-            return ext
+    # Every signature has a distinct two-byte lead, so one dict probe
+    # picks the only candidate and startswith confirms the rest
+    candidate = IMAGE_SIGNATURES.get(data[:2])
+    if candidate and data.startswith(candidate[0]):
+        return candidate[1]
     
     if len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WEBP":
         return ".webp"
@@ -161,17 +195,16 @@ def extract_requirements(text: str) -> List[Requirement]:
     if not text:
         return []
     
-    requirement_map = {
-        "shall not": "prohibition",
-        "shall": "mandatory",
-        "should": "recommendation",
-        "may": "permission"
-    }
+    # Cheap substring check before running the regex; most blocks
+    # carry no normative language at all
+    low = text.lower()
+    if not any(k in low for k in REQ_KEYWORDS):
+        return []
     
     requirements = []
     for match in REQ_RE.finditer(text):
         keyword = match.group(1).lower()
-        req_type = requirement_map.get(keyword)
+        req_type = REQ_TYPE_MAP.get(keyword)
         
         if req_type:
             requirements.append(Requirement(
@@ -191,41 +224,38 @@ def extract_references(text: str) -> List[str]:
     if not text:
         return []
     
-    references = []
-    
-    # Match clause references: "clause 1.2", "section A.3", etc.
-    clause_pattern = re.compile(r'\b(?:clause|section|paragraph)\s+([A-Z]?\d+(?:\.\d+)*)', re.IGNORECASE)
-    for match in clause_pattern.finditer(text):
-        references.append(f"clause:{match.group(1)}")
+    # Dict keys dedupe while keeping first-seen order, so the output is
+    # deterministic (a set's order changes with hash randomization)
+    references: Dict[str, None] = {}
     
-    # Match table references: "Table 1.2", etc.
-    table_pattern = re.compile(r'\btable\s+([A-Z]?\d+(?:\.\d+)*)', re.IGNORECASE)
-    for match in table_pattern.finditer(text):
-        references.append(f"table:{match.group(1)}")
-    
-    # Match figure references: "Figure 3.1", "Fig. 2", etc.
-    figure_pattern = re.compile(r'\b(?:figure|fig\.?)\s+([A-Z]?\d+(?:\.\d+)*)', re.IGNORECASE)
-    for match in figure_pattern.finditer(text):
-        references.append(f"figure:{match.group(1)}")
+    # One pass over the text for all three kinds of reference
+    for match in REF_RE.finditer(text):
+        if match.group("clause"):
+            references[f"clause:{match.group('ref')}"] = None
+        elif match.group("table"):
+            references[f"table:{match.group('ref')}"] = None
+        else:
+            references[f"figure:{match.group('ref')}"] = None
     
-    return list(set(references))  # Remove duplicates
+    return list(references)
 
 # =========================================================
 # PROCESSING CONTEXT - Tracks state during document parsing
 # =========================================================
 
-@dataclass
+@dataclass(slots=True)
 class ProcessingContext:
     """Maintains state while processing the document tree."""
     current_clause_id: Optional[str] = None
     pending_number: Optional[str] = None
-    pending_caption: Optional[str] = None
+    # (caption text, table number, figure number) parsed once in process_caption
+    pending_caption: Optional[Tuple[str, Optional[str], Optional[str]]] = None
     
     def reset_pending(self):
         """Clear pending items when starting new clause."""
         self.pending_caption = None
 
-@dataclass
+@dataclass(slots=True)
 class ProcessingCounters:
     """Track statistics during processing."""
     total_images: int = 0
@@ -250,6 +280,15 @@ class BlockProcessor:
         self.counters = counters
         self.img_root = img_root
         self.misc_img_dir = misc_img_dir
+        # Output-relative prefixes for the paths recorded in the schema,
+        # computed once instead of a relative_to() per image
+        self._img_root_rel = str(img_root.relative_to(OUTPUT_DIR))
+        self._misc_img_rel = str(misc_img_dir.relative_to(OUTPUT_DIR))
+        # Clause image folders already created for this document
+        self._created_dirs: set = set()
+        self._io_pool = ThreadPoolExecutor(max_workers=IMAGE_WRITE_WORKERS)
+        # (path, write future, undo the image's metadata if the write fails)
+        self._pending_writes: Deque[Tuple[Path, Future, Callable[[], None]]] = deque()
     
     def process_section_header(self, block: Dict):
         """Process section header blocks."""
@@ -285,8 +324,10 @@ class BlockProcessor:
         if not text:
             return
         
-        if extract_table_number(text) or extract_figure_number(text):
-            self.context.pending_caption = text
+        table_number = extract_table_number(text)
+        figure_number = extract_figure_number(text)
+        if table_number or figure_number:
+            self.context.pending_caption = (text, table_number, figure_number)
         else:
             self._add_to_current_clause_content(ContentItem("caption", text))
     
@@ -298,18 +339,22 @@ class BlockProcessor:
         
         self.counters.total_tables += 1
         
-        caption = self.context.pending_caption or strip_html(block.get("caption", ""))
-        table_number = extract_table_number(caption) if caption else None
+        pending = self.context.pending_caption
+        if pending:
+            caption, table_number, _ = pending
+        else:
+            caption = strip_html(block.get("caption", ""))
+            table_number = extract_table_number(caption) if caption else None
         
         table = TableEntry(
             html=html,
             number=table_number,
-            caption=caption if caption else None,
-            rows=block.get("rows")
+            caption=caption if caption else None
         )
         
-        if self.context.current_clause_id and self.context.current_clause_id in self.clauses:
-            self.clauses[self.context.current_clause_id].tables.append(table)
+        clause = self._current_clause()
+        if clause is not None:
+            clause.tables.append(table)
         
         self.context.pending_caption = None
     
@@ -336,46 +381,59 @@ class BlockProcessor:
             ext = detect_image_format(data)
             self.counters.total_images += 1
             
-            caption = self.context.pending_caption or strip_html(block.get("caption", ""))
-            figure_number = extract_figure_number(caption) if caption else None
+            pending = self.context.pending_caption
+            if pending:
+                caption, _, figure_number = pending
+            else:
+                caption = strip_html(block.get("caption", ""))
+                figure_number = extract_figure_number(caption) if caption else None
             
             img_ref = img_key.replace("/", "_").strip("_").lower()
             
-            if self.context.current_clause_id and self.context.current_clause_id in self.clauses:
-                self._save_clause_image(img_key, data, ext, img_ref, caption, figure_number)
+            clause = self._current_clause()
+            if clause is not None:
+                self._save_clause_image(clause, img_key, data, ext, img_ref, caption, figure_number)
             else:
                 self._save_misc_image(img_key, data, ext, img_ref, caption)
         
         except Exception as e:
             print(f"    Warning: Failed to process image {img_key}: {e}")
     
-    def _save_clause_image(self, img_key: str, data: bytes, ext: str, 
+    def _save_clause_image(self, clause: Clause, img_key: str, data: bytes, ext: str, 
                           img_ref: str, caption: Optional[str], figure_number: Optional[str]):
         """Save image to clause folder."""
-        cid = self.context.current_clause_id
+        cid = clause.id
         
         if cid not in self.counters.figure_counters:
             self.counters.figure_counters[cid] = 0
         self.counters.figure_counters[cid] += 1
         
-        clause_dir = self.img_root / cid.replace(".", "_")
-        clause_dir.mkdir(parents=True, exist_ok=True)
+        clause_dir_name = cid.replace(".", "_")
+        clause_dir = self.img_root / clause_dir_name
+        if clause_dir_name not in self._created_dirs:
+            clause_dir.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(clause_dir_name)
         
         fname = f"figure_{self.counters.figure_counters[cid]}_{img_ref}{ext}"
         fpath = clause_dir / fname
-        fpath.write_bytes(data)
         
         figure = FigureEntry(
             number=figure_number or self.counters.figure_counters[cid],
-            path=str(fpath.relative_to(OUTPUT_DIR)),
+            path=os.path.join(self._img_root_rel, clause_dir_name, fname),
             format=ext.lstrip("."),
             original_key=img_key,
             size_bytes=len(data),
             caption=caption
         )
         
-        self.clauses[self.context.current_clause_id].figures.append(figure)
+        clause.figures.append(figure)
         self.counters.clause_images += 1
+        
+        def rollback():
+            clause.figures.remove(figure)
+            self.counters.clause_images -= 1
+        
+        self._write_image(fpath, data, rollback)
     
     def _save_misc_image(self, img_key: str, data: bytes, ext: str, 
                         img_ref: str, caption: Optional[str]):
@@ -383,33 +441,66 @@ class BlockProcessor:
         self.counters.misc_image_counter += 1
         fname = f"misc_{self.counters.misc_image_counter}_{img_ref}{ext}"
         fpath = self.misc_img_dir / fname
-        fpath.write_bytes(data)
-        self.counters.misc_images += 1
         
-        self.counters.misc_image_metadata.append({
-            "path": str(fpath.relative_to(OUTPUT_DIR)),
+        entry = {
+            "path": os.path.join(self._misc_img_rel, fname),
             "caption": caption,
             "format": ext.lstrip("."),
             "original_key": img_key,
             "size_bytes": len(data)
-        })
+        }
+        
+        self.counters.misc_image_metadata.append(entry)
+        self.counters.misc_images += 1
+        
+        def rollback():
+            self.counters.misc_image_metadata.remove(entry)
+            self.counters.misc_images -= 1
+        
+        self._write_image(fpath, data, rollback)
+    
+    def _write_image(self, fpath: Path, data: bytes, rollback: Callable[[], None]):
+        """Queue an image write on the IO pool; rollback drops its metadata on failure."""
+        if len(self._pending_writes) >= MAX_PENDING_WRITES:
+            self._wait_writes(MAX_PENDING_WRITES - 1)
+        self._pending_writes.append((fpath, self._io_pool.submit(fpath.write_bytes, data), rollback))
+    
+    def _wait_writes(self, keep: int):
+        """Wait on the oldest queued writes until at most `keep` remain."""
+        while len(self._pending_writes) > keep:
+            fpath, future, rollback = self._pending_writes.popleft()
+            try:
+                future.result()
+            except Exception as e:
+                print(f"    Warning: Failed to process image {fpath.name}: {e}")
+                rollback()
+    
+    def finish_writes(self):
+        """Wait for all queued image writes and shut down the IO pool."""
+        self._wait_writes(0)
+        self._io_pool.shutdown()
     
     def process_text(self, block: Dict):
         """Process text blocks."""
         text = strip_html(block.get("html", ""))
+        if not text:
+            return
         
-        if text and self._has_current_clause():
-            clause = self.clauses[self.context.current_clause_id]
-            clause.content.append(ContentItem("paragraph", text))
-            clause.requirements.extend(extract_requirements(text))
-            
-            # Extract and store references
-            refs = extract_references(text)
-            for ref in refs:
-                if ref.startswith("clause:"):
-                    clause.references["internal"].append(ref.replace("clause:", ""))
-                elif ref.startswith("table:") or ref.startswith("figure:"):
-                    clause.references["internal"].append(ref)
+        clause = self._current_clause()
+        if clause is None:
+            return
+        
+        clause.content.append(ContentItem("paragraph", text))
+        clause.requirements.extend(extract_requirements(text))
+        
+        # Extract and store references
+        refs = extract_references(text)
+        internal = clause.references["internal"]
+        for ref in refs:
+            if ref.startswith("clause:"):
+                internal.append(ref.replace("clause:", ""))
+            elif ref.startswith("table:") or ref.startswith("figure:"):
+                internal.append(ref)
     
     def process_footnote(self, block: Dict):
         """Process footnote blocks."""
@@ -420,28 +511,44 @@ class BlockProcessor:
     def process_list_item(self, block: Dict):
         """Process list item blocks."""
         text = strip_html(block.get("html", ""))
+        if not text:
+            return
         
-        if text and self._has_current_clause():
-            clause = self.clauses[self.context.current_clause_id]
+        clause = self._current_clause()
+        if clause is not None:
             clause.content.append(ContentItem("list_item", text))
             clause.requirements.extend(extract_requirements(text))
     
-    def _has_current_clause(self) -> bool:
-        """Check if there's a current clause context."""
-        return self.context.current_clause_id and self.context.current_clause_id in self.clauses
+    def _current_clause(self) -> Optional[Clause]:
+        """Return the clause currently being filled, or None outside any clause."""
+        cid = self.context.current_clause_id
+        return self.clauses.get(cid) if cid else None
     
     def _add_to_current_clause_content(self, item: ContentItem):
         """Add content item to current clause."""
-        if self._has_current_clause():
-            self.clauses[self.context.current_clause_id].content.append(item)
+        clause = self._current_clause()
+        if clause is not None:
+            clause.content.append(item)
 
 # =========================================================
 # HIERARCHY BUILDING
 # =========================================================
 
+def clause_sort_key(clause: Clause) -> Tuple:
+    """Sort key placing numeric clauses (by number) before annex clauses."""
+    cid = clause.id
+    if cid[0].isdigit():
+        try:
+            return (0, tuple(map(int, cid.split("."))))
+        except ValueError:
+            return (0, (0,))
+    return (1, cid)
+
 def build_clause_hierarchy(clauses: Dict[str, Clause]) -> List[Clause]:
     """Build hierarchical clause structure with parent_id relationships."""
-    # Link children to parents and set parent_id
+    # Link children to parents and set parent_id. parent_id is only set
+    # here, so it doubles as the "already linked" check instead of scanning
+    # (and dataclass-comparing) the parent's children list.
     for cid, clause in clauses.items():
         if cid[0].isdigit():
             # Numeric clause: 1.1.2 -> parent is 1.1
@@ -450,7 +557,7 @@ def build_clause_hierarchy(clauses: Dict[str, Clause]) -> List[Clause]:
                 parent_id = ".".join(parts[:-1])
                 if parent_id in clauses:
                     parent = clauses[parent_id]
-                    if clause not in parent.children:
+                    if clause.parent_id is None:
                         parent.children.append(clause)
                         clause.parent_id = parent_id
         
@@ -460,7 +567,7 @@ def build_clause_hierarchy(clauses: Dict[str, Clause]) -> List[Clause]:
             parent_id = parts[0]
             if parent_id in clauses:
                 parent = clauses[parent_id]
-                if clause not in parent.children:
+                if clause.parent_id is None:
                     parent.children.append(clause)
                     clause.parent_id = parent_id
     
@@ -469,17 +576,7 @@ def build_clause_hierarchy(clauses: Dict[str, Clause]) -> List[Clause]:
     roots = [c for cid, c in clauses.items() if cid not in child_ids]
     
     # Sort: numeric first, then alphabetic
-    def sort_key(clause):
-        cid = clause.id
-        if cid[0].isdigit():
-            try:
-                return (0, [int(n) for n in cid.split(".")])
-            except ValueError:
-                return (0, [0])
-        else:
-            return (1, cid)
-    
-    roots.sort(key=sort_key)
+    roots.sort(key=clause_sort_key)
     return roots
 
 def flatten_clauses(clauses: List[Clause], doc_id: str) -> List[Dict]:
@@ -489,13 +586,12 @@ def flatten_clauses(clauses: List[Clause], doc_id: str) -> List[Dict]:
     """
     chunks = []
     
-    def process_clause(clause: Clause):
+    # Explicit LIFO stack; children are pushed reversed to keep pre-order
+    stack = list(reversed(clauses))
+    while stack:
+        clause = stack.pop()
         chunks.append(clause.to_dict(doc_id))
-        for child in clause.children:
-            process_clause(child)
-    
-    for clause in clauses:
-        process_clause(clause)
+        stack.extend(reversed(clause.children))
     
     return chunks
 
@@ -504,17 +600,7 @@ def flatten_clauses(clauses: List[Clause], doc_id: str) -> List[Dict]:
 # =========================================================
 
 def process_block(block: Dict, processor: BlockProcessor):
-    """Recursively process a block from Marker JSON."""
-    if not isinstance(block, dict):
-        return
-    
-    btype = block.get("block_type")
-    
-    # Skip headers/footers
-    if btype in ("PageHeader", "PageFooter"):
-        return
-    
-    # Dispatch to appropriate handler
+    """Process a block from Marker JSON and all of its descendants, in document order."""
     handlers = {
         "SectionHeader": processor.process_section_header,
         "Caption": processor.process_caption,
@@ -525,15 +611,28 @@ def process_block(block: Dict, processor: BlockProcessor):
         "ListItem": processor.process_list_item
     }
     
-    handler = handlers.get(btype)
-    if handler:
-        handler(block)
-    
-    # Process children recursively
-    children = block.get("children")
-    if children and isinstance(children, list):
-        for child in children:
-            process_block(child, processor)
+    # Explicit LIFO stack instead of recursion; children are pushed
+    # reversed so they are still visited in pre-order
+    stack = [block]
+    while stack:
+        block = stack.pop()
+        if not isinstance(block, dict):
+            continue
+        
+        btype = block.get("block_type")
+        
+        # Skip headers/footers
+        if btype in ("PageHeader", "PageFooter"):
+            continue
+        
+        # Dispatch to appropriate handler
+        handler = handlers.get(btype)
+        if handler:
+            handler(block)
+        
+        children = block.get("children")
+        if children and isinstance(children, list):
+            stack.extend(reversed(children))
 
 # =========================================================
 # FILE CONVERSION - Main entry point
@@ -542,7 +641,7 @@ def process_block(block: Dict, processor: BlockProcessor):
 def convert_file(path: Path) -> Dict:
     """Convert a Marker JSON file to structured schema."""
     # Load source JSON
-    raw = json.loads(path.read_text(encoding="utf-8"))
+    raw = orjson.loads(path.read_bytes())
     
     # Setup output directories
     doc_id = path.stem
@@ -553,7 +652,7 @@ def convert_file(path: Path) -> Dict:
     misc_img_dir.mkdir(parents=True, exist_ok=True)
     
     # Initialize data structures
-    clauses: Dict[str, Clause] = OrderedDict()
+    clauses: Dict[str, Clause] = {}
     context = ProcessingContext()
     counters = ProcessingCounters()
     
@@ -562,8 +661,12 @@ def convert_file(path: Path) -> Dict:
     
     # Process all blocks
     children = raw.get("children", [])
-    for child in children:
-        process_block(child, processor)
+    try:
+        for child in children:
+            process_block(child, processor)
+    finally:
+        # Images are written in the background; make sure they are on disk
+        processor.finish_writes()
     
     # Build hierarchy
     roots = build_clause_hierarchy(clauses)
@@ -608,6 +711,19 @@ def convert_file(path: Path) -> Dict:
 # MAIN EXECUTION
 # =========================================================
 
+def convert_and_write(path: Path) -> Tuple[str, Dict]:
+    """
+    Convert one file and write its schema.
+    Module-level so worker processes can unpickle it.
+    Returns: (output file name, statistics)
+    """
+    schema = convert_file(path)
+    
+    out_path = OUTPUT_SCHEMA_DIR / f"{path.stem}_final_schema.json"
+    out_path.write_bytes(orjson.dumps(schema, option=JSON_WRITE_OPTIONS))
+    
+    return out_path.name, schema["statistics"]
+
 def main():
     """Process all JSON files in input directory."""
     OUTPUT_SCHEMA_DIR.mkdir(parents=True, exist_ok=True)
@@ -620,32 +736,30 @@ def main():
     
     print(f"Found {len(json_files)} file(s) to process\n")
     
-    for file in json_files:
-        print(f"Processing: {file.name}")
+    # Files are independent, so they are converted in parallel and the
+    # results reported in the original order
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [executor.submit(convert_and_write, file) for file in json_files]
         
-        try:
-            schema = convert_file(file)
-            
-            out_path = OUTPUT_SCHEMA_DIR / f"{file.stem}_final_schema.json"
-            out_path.write_text(
-                json.dumps(schema, indent=2, ensure_ascii=False),
-                encoding="utf-8"
-            )
-            
-            stats = schema['statistics']
-            print(f"  [OK] Extracted {stats['total_images']} images")
-            print(f"    - {stats['images_in_clauses']} in clauses")
-            print(f"    - {stats['images_in_misc']} in misc folder")
-            print(f"  [OK] Extracted {stats['total_tables']} tables")
-            print(f"  [OK] Processed {stats['total_clauses']} clauses")
-            print(f"  [OK] Generated {stats['total_chunks']} chunks")
-            print(f"  [OK] Saved to: {out_path.name}\n")
+        for file, future in zip(json_files, futures):
+            print(f"Processing: {file.name}")
             
-        except Exception as e:
-            print(f"  [ERROR] {e}")
-            import traceback
-            traceback.print_exc()
-            print()
+            try:
+                out_name, stats = future.result()
+                
+                print(f"  [OK] Extracted {stats['total_images']} images")
+                print(f"    - {stats['images_in_clauses']} in clauses")
+                print(f"    - {stats['images_in_misc']} in misc folder")
+                print(f"  [OK] Extracted {stats['total_tables']} tables")
+                print(f"  [OK] Processed {stats['total_clauses']} clauses")
+                print(f"  [OK] Generated {stats['total_chunks']} chunks")
+                print(f"  [OK] Saved to: {out_name}\n")
+                
+            except Exception as e:
+                print(f"  [ERROR] {e}")
+                import traceback
+                traceback.print_exc()
+                print()
 
 # =========================================================
 # FASTAPI API (ADDITION ONLY)
@@ -661,16 +775,8 @@ def build_schema():
     if not json_files:
         raise HTTPException(status_code=404, detail="No JSON files found")
 
-    processed = []
-
-    for file in json_files:
-        schema = convert_file(file)
-        out_path = OUTPUT_SCHEMA_DIR / f"{file.stem}_final_schema.json"
-        out_path.write_text(
-            json.dumps(schema, indent=2, ensure_ascii=False),
-            encoding="utf-8"
-        )
-        processed.append(out_path.name)
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        processed = [name for name, _ in executor.map(convert_and_write, json_files)]
 
     return {
         "status": "success",
@@ -1,7 +1,11 @@
-import json
+import hashlib
+import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Set
+from typing import BinaryIO, FrozenSet, List, Dict, Set, Tuple, Optional
+import orjson
 from fastapi import FastAPI, HTTPException
 from src.path import OUTPUT_SCHEMA_DIR, OUTPUT_DIR
 
@@ -12,6 +16,17 @@ from src.path import OUTPUT_SCHEMA_DIR, OUTPUT_DIR
 CHUNK_DIR = OUTPUT_DIR / "output_json_chunk"
 CHUNK_DIR.mkdir(parents=True, exist_ok=True)
 
+# One <doc_id>.jsonl shard per document (one chunk per line) instead of
+# one JSON file per chunk; set False for the legacy per-chunk layout
+WRITE_JSONL_SHARDS = True
+
+# Worker processes for chunking schema files in parallel
+MAX_WORKERS = os.cpu_count() or 1
+
+# Sidecar recording each schema's mtime/sha256 at its last build, so
+# unchanged schemas are skipped on the next run
+BUILD_STATE_FILE = CHUNK_DIR / ".buildstate.json"
+
 # =========================================================
 # INTERNAL REFERENCE PATTERNS (ROBUST, NON-HALLUCINATED)
 # =========================================================
@@ -21,13 +36,6 @@ NUMERIC_REF_PATTERN = re.compile(
     r'\b\d+(?:\.\d+){0,4}\b'
 )
 
-# Keyword-based internal references
-# Clause 6.1, Section 2, Annex A, Subclause 7.3
-KEYWORD_REF_PATTERN = re.compile(
-    r'\b(Clause|Subclause|Section|Annex)\s+([A-Z]|\d+(?:\.\d+)*)',
-    re.IGNORECASE
-)
-
 TABLE_PATTERN = re.compile(
     r'\bTable\s+\d+[A-Z]?\b',
     re.IGNORECASE
@@ -38,6 +46,19 @@ FIGURE_PATTERN = re.compile(
     re.IGNORECASE
 )
 
+# Keyword (Clause 6.1, Section 2, Annex A, Subclause 7.3), table and
+# figure references in one alternation, so a text is scanned once for
+# all three. NUMERIC_REF_PATTERN stays a separate pass: its matches
+# deliberately overlap these (the "6.1" in "Clause 6.1").
+INTERNAL_REF_PATTERN = re.compile(
+    r'\b(?:'
+    r'(?P<kw>Clause|Subclause|Section|Annex)\s+(?P<ref>[A-Z]|\d+(?:\.\d+)*)'
+    r'|(?P<table>Table\s+\d+[A-Z]?\b)'
+    r'|(?P<figure>Figure\s+\d+[A-Z]?\b)'
+    r')',
+    re.IGNORECASE
+)
+
 STANDARD_PATTERN = re.compile(
     r'\b(?:'
     r'BS\s+EN|'
@@ -71,49 +92,63 @@ def extract_text_blocks(content: List[Dict]) -> List[str]:
 # Reference Extraction
 # =========================================================
 
-def extract_internal_references(content: List[Dict]) -> Set[str]:
-    texts = extract_text_blocks(content)
+def extract_all_references(texts: List[str]) -> Tuple[Set[str], Set[str]]:
+    """
+    Collect internal references and external standards in one walk
+    over the chunk's texts (see extract_text_blocks).
+    Returns: (internal_raw, standards)
+    """
     refs = set()
+    standards = set()
 
     for text in texts:
-        for kw, ref in KEYWORD_REF_PATTERN.findall(text):
-            refs.add(f"{kw} {ref}")
-
+        for m in INTERNAL_REF_PATTERN.finditer(text):
+            kind = m.lastgroup
+            if kind == "table" or kind == "figure":
+                refs.add(m.group(kind))
+                continue
+
+            ref = m.group("ref")
+            refs.add(sys.intern(f"{m.group('kw')} {ref}"))
+
+            # A one-letter ref can be the first letter of a table/figure
+            # reference ("Annex Table 3"), which the combined pass has
+            # already consumed; check that one position directly
+            if len(ref) == 1 and not ref.isdigit():
+                start = m.end() - 1
+                for pattern in (TABLE_PATTERN, FIGURE_PATTERN):
+                    overlap = pattern.match(text, start)
+                    if overlap:
+                        refs.add(overlap.group(0))
+
+        # Clause numbers repeat heavily across a document; interned copies
+        # share one object and compare by identity in the id lookups
         for num in NUMERIC_REF_PATTERN.findall(text):
-            refs.add(num)
-
-        for t in TABLE_PATTERN.findall(text):
-            refs.add(t)
-
-        for f in FIGURE_PATTERN.findall(text):
-            refs.add(f)
-
-    return refs
+            refs.add(sys.intern(num))
 
-def extract_external_standards(content: List[Dict]) -> Set[str]:
-    texts = extract_text_blocks(content)
-    standards = set()
-
-    for text in texts:
         for match in STANDARD_PATTERN.finditer(text):
             standards.add(match.group(0).strip())
 
-    return standards
+    return refs, standards
 
 def resolve_internal_references(
     raw_refs: Set[str],
-    known_chunk_ids: Set[str],
+    known_chunk_ids: FrozenSet[str],
     document_id: str
 ) -> List[str]:
     """
     Resolve internal references ONLY if exact chunk ID exists.
     """
+    prefix = f"{document_id}::"
     resolved = set()
 
     for ref in raw_refs:
-        ref_id = ref.split()[-1]  # handles "Clause 6.1" → "6.1"
+        # Last whitespace-separated token: "Clause 6.1" → "6.1". rsplit with
+        # maxsplit=1 stops at the first separator from the right, and still
+        # honours tabs/newlines left in matched "Table\n3"-style refs.
+        ref_id = ref.rsplit(None, 1)[-1]
         if ref_id in known_chunk_ids:
-            resolved.add(f"{document_id}::{ref_id}")
+            resolved.add(prefix + ref_id)
 
     return sorted(resolved)
 
@@ -121,14 +156,16 @@ def resolve_internal_references(
 # Chunk Writer
 # =========================================================
 
-def write_chunk(chunk: dict, known_chunk_ids: Set[str]):
+def write_chunk(chunk: dict, known_chunk_ids: FrozenSet[str], shard: Optional[BinaryIO] = None):
+    """
+    Write one clause chunk: appended as a line to the document's open
+    JSONL shard if given, otherwise as its own JSON file.
+    """
     doc_id = chunk["document_id"]
-    doc_dir = CHUNK_DIR / doc_id
-    doc_dir.mkdir(parents=True, exist_ok=True)
 
     # --- Extract references ---
-    internal_raw = extract_internal_references(chunk.get("content", []))
-    external_standards = extract_external_standards(chunk.get("content", []))
+    texts = extract_text_blocks(chunk.get("content", []))
+    internal_raw, external_standards = extract_all_references(texts)
     internal_resolved = resolve_internal_references(
         internal_raw,
         known_chunk_ids,
@@ -153,14 +190,140 @@ def write_chunk(chunk: dict, known_chunk_ids: Set[str]):
         "children_ids": chunk.get("children_ids", [])
     }
 
+    if shard is not None:
+        shard.write(orjson.dumps(out_chunk) + b"\n")
+        return
+
+    doc_dir = CHUNK_DIR / doc_id
+    doc_dir.mkdir(parents=True, exist_ok=True)
+
     out_path = doc_dir / f"{safe_filename(chunk['id'])}.json"
-    out_path.write_text(
-        json.dumps(out_chunk, indent=2, ensure_ascii=False),
-        encoding="utf-8"
-    )
+    out_path.write_bytes(orjson.dumps(out_chunk, option=orjson.OPT_INDENT_2))
+
+# =========================================================
+# Per-document processing
+# =========================================================
+
+def process_schema_file(schema_file: Path) -> Optional[Tuple[str, int]]:
+    """
+    Write every chunk of one schema file.
+    Module-level so worker processes can unpickle it.
+    Returns: (document_id, chunk count), or None for an invalid schema
+    """
+    schema = orjson.loads(schema_file.read_bytes())
+
+    doc_id = schema.get("document_id")
+    chunks = schema.get("chunks", [])
+
+    if not doc_id or not chunks:
+        return None
+
+    # Build chunk ID index ONCE per document
+    known_chunk_ids = frozenset(sys.intern(c["id"]) for c in chunks if "id" in c)
+
+    doc_dir = CHUNK_DIR / doc_id
+    doc_dir.mkdir(parents=True, exist_ok=True)
+    shard_path = doc_dir / f"{doc_id}.jsonl"
+
+    # Drop the other layout's files so readers never pick up stale chunks
+    if WRITE_JSONL_SHARDS:
+        for legacy_file in doc_dir.glob("*.json"):
+            legacy_file.unlink()
+
+        with open(shard_path, "wb") as shard:
+            for chunk in chunks:
+                write_chunk(chunk, known_chunk_ids, shard)
+    else:
+        shard_path.unlink(missing_ok=True)
+
+        for chunk in chunks:
+            write_chunk(chunk, known_chunk_ids)
+
+    return doc_id, len(chunks)
 
 # =========================================================
-# Main (UNCHANGED)
+# Incremental build
+# =========================================================
+
+def load_build_state() -> Dict[str, Dict]:
+    try:
+        return orjson.loads(BUILD_STATE_FILE.read_bytes())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return {}
+
+def save_build_state(state: Dict[str, Dict]):
+    BUILD_STATE_FILE.write_bytes(orjson.dumps(state, option=orjson.OPT_INDENT_2))
+
+def check_schema(schema_file: Path, entry: Optional[Dict]) -> Tuple[bool, Dict]:
+    """
+    Compare a schema file against its recorded build state.
+    The mtime is checked first; the file is only hashed when it moved.
+    Returns: (unchanged, fresh state entry)
+    """
+    layout = "jsonl" if WRITE_JSONL_SHARDS else "json"
+    mtime = schema_file.stat().st_mtime
+
+    if entry and entry.get("layout") == layout and entry.get("mtime") == mtime:
+        return True, entry
+
+    digest = hashlib.sha256(schema_file.read_bytes()).hexdigest()
+    fresh = {"mtime": mtime, "sha256": digest, "layout": layout}
+
+    unchanged = bool(entry) and entry.get("layout") == layout and entry.get("sha256") == digest
+    if unchanged:
+        fresh["document_id"] = entry["document_id"]
+
+    return unchanged, fresh
+
+def has_chunk_output(doc_id: str) -> bool:
+    """Check that a document's chunks exist on disk in the current layout."""
+    doc_dir = CHUNK_DIR / doc_id
+
+    if WRITE_JSONL_SHARDS:
+        return (doc_dir / f"{doc_id}.jsonl").is_file()
+    return any(doc_dir.glob("*.json"))
+
+def build_schema_files(
+    schema_files: List[Path]
+) -> Tuple[List[Tuple[Path, Optional[Tuple[str, int]]]], List[str]]:
+    """
+    Chunk every schema that changed since the last build, in parallel.
+    Schemas whose content is unchanged and whose chunks are still on disk
+    are skipped.
+    Returns: ([(schema_file, process_schema_file result)], skipped document ids)
+    """
+    state = load_build_state()
+    new_state: Dict[str, Dict] = {}
+    fresh_entries: Dict[str, Dict] = {}
+    pending: List[Path] = []
+    skipped: List[str] = []
+
+    for schema_file in schema_files:
+        entry = state.get(schema_file.name)
+        unchanged, fresh = check_schema(schema_file, entry)
+
+        if unchanged and has_chunk_output(fresh["document_id"]):
+            new_state[schema_file.name] = fresh
+            skipped.append(fresh["document_id"])
+        else:
+            fresh_entries[schema_file.name] = fresh
+            pending.append(schema_file)
+
+    results = []
+    if pending:
+        # Documents are independent; chunk them in parallel
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            results = list(zip(pending, executor.map(process_schema_file, pending)))
+
+    for schema_file, result in results:
+        if result is not None:
+            new_state[schema_file.name] = {**fresh_entries[schema_file.name], "document_id": result[0]}
+
+    save_build_state(new_state)
+    return results, skipped
+
+# =========================================================
+# Main
 # =========================================================
 
 def main():
@@ -170,23 +333,18 @@ def main():
         print(f"No schema files found in {OUTPUT_SCHEMA_DIR}")
         return
 
-    for schema_file in schema_files:
-        schema = json.loads(schema_file.read_text(encoding="utf-8"))
-
-        doc_id = schema.get("document_id")
-        chunks = schema.get("chunks", [])
+    results, skipped = build_schema_files(schema_files)
 
-        if not doc_id or not chunks:
+    for schema_file, result in results:
+        if result is None:
             print(f"Skipping {schema_file.name}: invalid schema")
             continue
 
-        # Build chunk ID index ONCE per document
-        known_chunk_ids = {c["id"] for c in chunks if "id" in c}
+        doc_id, chunk_count = result
+        print(f"[OK] {doc_id} → {chunk_count} chunks processed")
 
-        for chunk in chunks:
-            write_chunk(chunk, known_chunk_ids)
-
-        print(f"[OK] {doc_id} → {len(chunks)} chunks processed")
+    for doc_id in skipped:
+        print(f"[SKIP] {doc_id} unchanged since last build")
 
 # =========================================================
 # FASTAPI API (ONLY ADDITION)
@@ -203,27 +361,14 @@ def build_chunks():
             detail=f"No schema files found in {OUTPUT_SCHEMA_DIR}"
         )
 
-    processed_docs = []
-
-    for schema_file in schema_files:
-        schema = json.loads(schema_file.read_text(encoding="utf-8"))
-
-        doc_id = schema.get("document_id")
-        chunks = schema.get("chunks", [])
-
-        if not doc_id or not chunks:
-            continue
-
-        known_chunk_ids = {c["id"] for c in chunks if "id" in c}
-        for chunk in chunks:
-            write_chunk(chunk, known_chunk_ids)
-
-        processed_docs.append(doc_id)
+    results, skipped = build_schema_files(schema_files)
+    processed_docs = [result[0] for _, result in results if result is not None]
 
     return {
         "status": "success",
         "documents_chunked": len(processed_docs),
-        "documents": processed_docs
+        "documents": processed_docs,
+        "documents_skipped": skipped
     }
 
 if __name__ == "__main__":
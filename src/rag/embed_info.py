@@ -1,5 +1,6 @@
-import json
+import threading
 from pathlib import Path
+import orjson
 from fastapi import FastAPI, HTTPException
 from sentence_transformers import SentenceTransformer
 import chromadb
@@ -18,18 +19,40 @@ COLLECTION_NAME = "standards_scope"
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
 BATCH_SIZE = 64
+ADD_BATCH_SIZE = 1024  # rows per collection.add; stays under Chroma's max batch size
 
 # =========================================================
 # CORE EMBEDDING LOGIC (AI + FUNCTIONALITY UNCHANGED)
 # =========================================================
 
-def embed_all_scopes() -> int:
-    model = SentenceTransformer(MODEL_NAME)
+# Loaded once per process and shared by every /scope/embed request.
+# Sync endpoints run on a thread pool, so first use is guarded by a lock.
+_model = None
+_client = None
+_init_lock = threading.Lock()
+
+def get_model() -> SentenceTransformer:
+    global _model
+    if _model is None:
+        with _init_lock:
+            if _model is None:
+                _model = SentenceTransformer(MODEL_NAME)
+    return _model
+
+def get_client():
+    global _client
+    if _client is None:
+        with _init_lock:
+            if _client is None:
+                _client = chromadb.PersistentClient(
+                    path=str(VECTOR_DB_INFO),
+                    settings=Settings(anonymized_telemetry=False)
+                )
+    return _client
 
-    client = chromadb.PersistentClient(
-        path=str(VECTOR_DB_INFO),
-        settings=Settings(anonymized_telemetry=False)
-    )
+def embed_all_scopes() -> int:
+    model = get_model()
+    client = get_client()
 
     collection = client.get_or_create_collection(
         name=COLLECTION_NAME,
@@ -37,10 +60,9 @@ def embed_all_scopes() -> int:
     )
 
     ids, documents, metadatas = [], [], []
-    total = 0
 
     for scope_file in sorted(SCOPE_DIR.glob("*_scope.json")):
-        data = json.loads(scope_file.read_text(encoding="utf-8"))
+        data = orjson.loads(scope_file.read_bytes())
 
         document_id = data.get("document_id")
         title = data.get("document_title") or ""
@@ -67,34 +89,29 @@ def embed_all_scopes() -> int:
             "tests": "\n".join(tests) if tests else ""
         })
 
-        if len(ids) >= BATCH_SIZE:
-            collection.add(
-                ids=ids,
-                documents=documents,
-                embeddings=model.encode(
-                    documents,
-                    normalize_embeddings=True,
-                    batch_size=BATCH_SIZE
-                ).tolist(),
-                metadatas=metadatas
-            )
-            total += len(ids)
-            ids, documents, metadatas = [], [], []
-
-    if ids:
+    if not ids:
+        return 0
+
+    # One encode over the whole corpus lets SentenceTransformer batch
+    # internally; the numpy array goes to Chroma as-is, no .tolist()
+    embeddings = model.encode(
+        documents,
+        normalize_embeddings=True,
+        batch_size=BATCH_SIZE,
+        convert_to_numpy=True,
+        show_progress_bar=False
+    )
+
+    for start in range(0, len(ids), ADD_BATCH_SIZE):
+        end = start + ADD_BATCH_SIZE
         collection.add(
-            ids=ids,
-            documents=documents,
-            embeddings=model.encode(
-                documents,
-                normalize_embeddings=True,
-                batch_size=BATCH_SIZE
-            ).tolist(),
-            metadatas=metadatas
+            ids=ids[start:end],
+            documents=documents[start:end],
+            embeddings=embeddings[start:end],
+            metadatas=metadatas[start:end]
         )
-        total += len(ids)
 
-    return total
+    return len(ids)
 
 # =========================================================
 # FASTAPI
@@ -153,8 +153,9 @@ def embed_all_chunks():
             if len(texts) >= BATCH_SIZE:
                 embeddings = model.encode(
                     texts,
-                    normalize_embeddings=True
-                ).tolist()
+                    normalize_embeddings=True,
+                    convert_to_numpy=True
+                )
 
                 collection.add(
                     ids=ids,
@@ -168,8 +169,9 @@ def embed_all_chunks():
     if texts:
         embeddings = model.encode(
             texts,
-            normalize_embeddings=True
-        ).tolist()
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
 
         collection.add(
             ids=ids,
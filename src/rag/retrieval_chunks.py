@@ -16,7 +16,9 @@ VECTOR_DB_CHUNK = VECTOR_DB_DIR / "vector_db_chunk"
 COLLECTION_NAME = "standards_chunks"
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
-OVERFETCH_K = 50
+OVERFETCH_K = 50        # upper bound on candidates fetched for reranking
+MIN_OVERFETCH_K = 32    # floor so small top_k still has room to rerank
+OVERFETCH_FACTOR = 4
 TOP_K = 10
 
 # =========================================================
@@ -29,8 +31,9 @@ def tokenize(text: str):
 def normalized_lexical_overlap(query_tokens: set, text: str) -> float:
     if not query_tokens:
         return 0.0
-    text_tokens = set(tokenize(text))
-    return len(query_tokens & text_tokens) / len(query_tokens)
+    # intersection() takes the token list directly: no set is built for
+    # the whole chunk, only for the tokens it shares with the query
+    return len(query_tokens.intersection(tokenize(text))) / len(query_tokens)
 
 def clause_depth(clause_id: str) -> int:
     return clause_id.count(".") if clause_id else 0
@@ -46,6 +49,14 @@ def is_direct_child(parent: str, child: str) -> bool:
     remainder = child[len(parent) + 1:]
     return "." not in remainder
 
+def overfetch_k(top_k: int) -> int:
+    """
+    Number of candidates to ask Chroma for.
+    Scales with top_k so small requests traverse less of the HNSW graph,
+    capped at OVERFETCH_K.
+    """
+    return min(OVERFETCH_K, max(top_k * OVERFETCH_FACTOR, MIN_OVERFETCH_K))
+
 # =========================================================
 # CORE RETRIEVAL (FIXED, MINIMAL)
 # =========================================================
@@ -59,12 +70,13 @@ def retrieve_best_chunks(query: str, top_k: int = TOP_K):
     )
     collection = client.get_collection(COLLECTION_NAME)
 
-    query_embedding = model.encode(query, normalize_embeddings=True).tolist()
+    # float32 array straight from the encoder; no per-float list round trip
+    query_embedding = model.encode(query, normalize_embeddings=True, convert_to_numpy=True)
     query_tokens = set(tokenize(query))
 
     results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=OVERFETCH_K,
+        query_embeddings=query_embedding[None, :],
+        n_results=overfetch_k(top_k),
         include=["documents", "metadatas", "distances"]
     )
 
@@ -1,6 +1,13 @@
+import asyncio
+import queue
 import re
-import statistics
-from typing import List
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import List, Optional
+import numpy as np
 from fastapi import FastAPI
 from pydantic import BaseModel
 
@@ -21,22 +28,110 @@ MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 TOP_K = 5
 OVERFETCH_K = 20
 
+TOKEN_RE = re.compile(r"[a-zA-Z0-9]+")
+
+MIN_SCORE_STD = 1e-6  # below this the candidate distances count as tied
+
+QUERY_CACHE_SIZE = 1024          # exact (text, top_k) entries
+SEMANTIC_CACHE_SIZE = 256        # query embeddings kept for near-duplicate lookups
+SEMANTIC_CACHE_THRESHOLD = 0.95  # cosine similarity needed to reuse candidates
+QUERY_CACHE_TTL = 300.0          # seconds; bounds staleness after re-embedding
+
+ENCODE_BATCH_WINDOW = 0.005  # seconds to wait for concurrent queries to share an encode
+ENCODE_BATCH_SIZE = 32
+
 # =========================================================
 # UTILITIES (UNCHANGED)
 # =========================================================
 
-def tokenize(text: str):
-    return set(re.findall(r"[a-zA-Z0-9]+", text.lower()))
+# Scope documents come back for many queries; cache their token sets.
+# Frozen so a cached set can't be mutated by a caller.
+@lru_cache(maxsize=8192)
+def tokenize(text: str) -> frozenset:
+    return frozenset(TOKEN_RE.findall(text.lower()))
 
 def normalized_lexical_overlap(query_tokens, text_tokens):
     if not query_tokens:
         return 0.0
     return len(query_tokens & text_tokens) / len(query_tokens)
 
-def z_score(value, mean, std):
-    if std == 0:
-        return 0.0
-    return (value - mean) / std
+# =========================================================
+# QUERY CACHE
+# =========================================================
+
+class QueryCache:
+    """
+    Two-tier cache in front of the vector search.
+    Exact tier: LRU of ranked results keyed on (embedding text, top_k).
+    Semantic tier: ring buffer of normalized query embeddings; a query whose
+    cosine similarity to a cached one reaches the threshold reuses its
+    retrieved candidates, which are then scored against the new query.
+    Entries expire after ttl seconds.
+    """
+
+    def __init__(self, maxsize: int, semantic_size: int, threshold: float, ttl: float):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self._exact: OrderedDict = OrderedDict()
+        self._vectors: Optional[np.ndarray] = None
+        self._semantic: List[Optional[tuple]] = [None] * semantic_size
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def get_exact(self, text: str, top_k: int) -> Optional[list]:
+        key = (text, top_k)
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is None:
+                return None
+
+            stored_at, results = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._exact[key]
+                return None
+
+            self._exact.move_to_end(key)
+            return results
+
+    def get_similar(self, embedding: np.ndarray) -> Optional[tuple]:
+        with self._lock:
+            if self._vectors is None:
+                return None
+
+            # Unused slots are zero rows, so they never reach the threshold
+            sims = self._vectors @ embedding
+            candidates = np.flatnonzero(sims >= self.threshold)
+            now = time.monotonic()
+
+            for idx in candidates[np.argsort(-sims[candidates])]:
+                stored_at, retrieved = self._semantic[idx]
+                if now - stored_at <= self.ttl:
+                    return retrieved
+
+            return None
+
+    def put(self, text: str, top_k: int, embedding: np.ndarray, retrieved: tuple, results: list):
+        now = time.monotonic()
+        with self._lock:
+            self._exact[(text, top_k)] = (now, results)
+            self._exact.move_to_end((text, top_k))
+            if len(self._exact) > self.maxsize:
+                self._exact.popitem(last=False)
+
+            if self._vectors is None:
+                self._vectors = np.zeros((len(self._semantic), embedding.shape[0]), dtype=np.float32)
+
+            self._vectors[self._next] = embedding
+            self._semantic[self._next] = (now, retrieved)
+            self._next = (self._next + 1) % len(self._semantic)
+
+_query_cache = QueryCache(
+    maxsize=QUERY_CACHE_SIZE,
+    semantic_size=SEMANTIC_CACHE_SIZE,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl=QUERY_CACHE_TTL
+)
 
 # =========================================================
 # INPUT JSON → EMBEDDING TEXT (UNCHANGED)
@@ -72,46 +167,132 @@ def input_json_to_embedding_text(input_json: dict) -> str:
 # RETRIEVAL LOGIC (AI UNCHANGED)
 # =========================================================
 
-def retrieve_relevant_documents(embedding_text: str, top_k: int = TOP_K):
-    if not embedding_text:
+# Loaded once per process and shared by every /recommend request.
+# First use can race between the encode batcher's worker thread and the
+# requests retrieving through asyncio.to_thread, so it is guarded by a lock.
+_model = None
+_client = None
+_collection = None
+_init_lock = threading.Lock()
+
+def get_model() -> SentenceTransformer:
+    global _model
+    if _model is None:
+        with _init_lock:
+            if _model is None:
+                _model = SentenceTransformer(MODEL_NAME)
+    return _model
+
+def get_collection():
+    global _client, _collection
+    if _collection is None:
+        with _init_lock:
+            if _client is None:
+                _client = chromadb.PersistentClient(
+                    path=str(VECTOR_DB_INFO),
+                    settings=Settings(anonymized_telemetry=False)
+                )
+            if _collection is None:
+                _collection = _client.get_collection(COLLECTION_NAME)
+    return _collection
+
+class EncodeBatcher:
+    """
+    Coalesces concurrent query encodes into one model forward pass.
+    Callers block in encode() while a single worker thread gathers every
+    query that arrives within the batch window (up to max_batch) and
+    encodes them together.
+    """
+
+    def __init__(self, window: float, max_batch: int):
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def encode(self, text: str) -> np.ndarray:
+        future: Future = Future()
+        self._queue.put((text, future))
+
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, daemon=True)
+                    self._worker.start()
+
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                embeddings = get_model().encode(
+                    [text for text, _ in batch],
+                    batch_size=self.max_batch,
+                    normalize_embeddings=True,
+                    convert_to_numpy=True
+                )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+_encode_batcher = EncodeBatcher(window=ENCODE_BATCH_WINDOW, max_batch=ENCODE_BATCH_SIZE)
+
+def rank_candidates(query_tokens, documents: list, metadatas: list, distances: np.ndarray, top_k: int):
+    """Score retrieved candidates against the query and return the top_k."""
+    n = len(documents)
+    if n == 0:
         return []
 
-    model = SentenceTransformer(MODEL_NAME)
-
-    client = chromadb.PersistentClient(
-        path=str(VECTOR_DB_INFO),
-        settings=Settings(anonymized_telemetry=False)
-    )
-
-    collection = client.get_collection(COLLECTION_NAME)
-
-    query_embedding = model.encode(
-        embedding_text,
-        normalize_embeddings=True
-    ).tolist()
-
-    query_tokens = tokenize(embedding_text)
-
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=OVERFETCH_K,
-        include=["documents", "metadatas", "distances"]
+    # Score every candidate as array ops: z-scored similarity plus a
+    # small lexical-overlap bonus. Similarity is 1 - distance, and a
+    # z-score is unchanged by that shift, so it is taken on the negated
+    # distances; 1 - d is only computed for the rows returned.
+    std_dist = distances.std()
+    if std_dist < MIN_SCORE_STD:
+        # Near-identical distances: z-scoring would only amplify float
+        # noise, so the lexical bonus alone decides the order
+        z = np.zeros(n)
+    else:
+        z = (distances.mean() - distances) / std_dist
+
+    lexical = np.fromiter(
+        (normalized_lexical_overlap(query_tokens, tokenize(doc)) for doc in documents),
+        dtype=np.float64,
+        count=n
     )
-
-    similarities = [1.0 - d for d in results["distances"][0]]
-    mean_sim = statistics.mean(similarities)
-    std_sim = statistics.pstdev(similarities)
+    scores = z + lexical * 0.1
+
+    # Highest scores first, ties kept in retrieval order. Only rows scoring
+    # at least the k-th best (ties included) are sorted; when every row is
+    # returned there is nothing to partition.
+    if 0 < top_k < n:
+        kth = np.partition(scores, n - top_k)[n - top_k]
+        top = np.flatnonzero(scores >= kth)
+        order = top[np.argsort(-scores[top], kind="stable")][:top_k]
+    else:
+        order = np.argsort(-scores, kind="stable")[:top_k]
 
     ranked = []
 
-    for i, similarity in enumerate(similarities):
-        doc_text = results["documents"][0][i]
-        metadata = results["metadatas"][0][i]
-
-        doc_tokens = tokenize(doc_text)
-        lexical = normalized_lexical_overlap(query_tokens, doc_tokens)
-
-        score = z_score(similarity, mean_sim, std_sim) + lexical * 0.1
+    for i in order.tolist():
+        metadata = metadatas[i]
 
         # ---- FIX: convert tests string → list[str] ----
         tests_raw = metadata.get("tests", "")
@@ -122,12 +303,45 @@ def retrieve_relevant_documents(embedding_text: str, top_k: int = TOP_K):
             "heading": metadata.get("document_title", ""),
             "summary": metadata.get("summary", ""),
             "tests": tests_list,
-            "similarity": round(similarity, 4),
-            "score": round(score, 4)
+            "similarity": round(1.0 - float(distances[i]), 4),
+            "score": round(float(scores[i]), 4)
         })
 
-    ranked.sort(key=lambda x: x["score"], reverse=True)
-    return ranked[:top_k]
+    return ranked
+
+def retrieve_relevant_documents(embedding_text: str, top_k: int = TOP_K):
+    if not embedding_text:
+        return []
+
+    cached = _query_cache.get_exact(embedding_text, top_k)
+    if cached is not None:
+        return cached
+
+    collection = get_collection()
+
+    # Encoded alongside any concurrent requests; kept as a numpy array,
+    # which Chroma accepts without a .tolist() round trip
+    query_embedding = _encode_batcher.encode(embedding_text)
+
+    # A near-duplicate query reuses the retrieved candidates, but they are
+    # always scored against this query's own tokens
+    retrieved = _query_cache.get_similar(query_embedding)
+    if retrieved is None:
+        results = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=OVERFETCH_K,
+            include=["documents", "metadatas", "distances"]
+        )
+        retrieved = (
+            results["documents"][0],
+            results["metadatas"][0],
+            np.asarray(results["distances"][0], dtype=np.float64)
+        )
+
+    ranked = rank_candidates(tokenize(embedding_text), *retrieved, top_k)
+
+    _query_cache.put(embedding_text, top_k, query_embedding, retrieved, ranked)
+    return ranked
 
 # =========================================================
 # FASTAPI
@@ -151,11 +365,14 @@ class RecommendationResult(BaseModel):
     score: float
 
 @app.post("/recommend", response_model=List[RecommendationResult])
-def recommend(req: RecommendationRequest):
+async def recommend(req: RecommendationRequest):
 
     embedding_text = input_json_to_embedding_text(req.input_json)
 
-    return retrieve_relevant_documents(
+    # Retrieval blocks on the encoder and Chroma; run it off the event
+    # loop so concurrent requests can meet in the same encode batch
+    return await asyncio.to_thread(
+        retrieve_relevant_documents,
         embedding_text=embedding_text,
         top_k=req.top_k
     )
\ No newline at end of file